@@ -1,12 +1,15 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
+from tsdownsample import LTTBDownsampler
+from kernels import nanmean_cols
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import os
-import base64
+import tempfile
 from datetime import time
 
 # Page configuration
@@ -17,129 +20,131 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def load_custom_css():
+    """Read the dashboard stylesheet once per server process"""
+    return (Path(__file__).parent / "static" / "custom.css").read_text(encoding="utf-8")
+
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    [data-testid="stSidebar"] {
-        background: linear-gradient(135deg, #1a237e 0%, #283593 100%);
-        color: white;
-    }
-    [data-testid="stSidebar"] .css-1d391kg {
-        background: linear-gradient(135deg, #1a237e 0%, #283593 100%);
-    }
-    [data-testid="stSidebar"] .css-1d391kg .css-1d391kg {
-        background: linear-gradient(135deg, #1a237e 0%, #283593 100%);
-    }
-    .main-header {
-        background: linear-gradient(135deg, #1a237e 0%, #283593 100%);
-        color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-    }
-    .metric-card {
-        background: linear-gradient(135deg, #fff 0%, #f8f9fa 100%);
-        border-left: 4px solid #1a237e;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 0.5rem 0;
-    }
-    .insight-box {
-        background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%);
-        border-left: 4px solid #2196f3;
-        padding: 15px;
-        border-radius: 5px;
-        margin: 10px 0;
-    }
-    .recommendation-box {
-        background: linear-gradient(135deg, #f3e5f5 0%, #e1bee7 100%);
-        border-left: 4px solid #9c27b0;
-        padding: 15px;
-        border-radius: 5px;
-        margin: 10px 0;
-    }
-    .sidebar-logo {
-        text-align: center;
-        margin-bottom: 2rem;
-        padding: 1rem;
-    }
-    .sidebar-logo img {
-        max-width: 250px;
-        height: auto;
-        border-radius: 10px;
-    }
-    .sidebar-title {
-        color: white;
-        text-align: center;
-        margin-bottom: 2rem;
-        font-size: 1.2rem;
-        font-weight: bold;
-    }
-    .sidebar-nav {
-        color: white;
-    }
-    .sidebar-nav .stSelectbox {
-        color: white;
-    }
-    .sidebar-nav .stSelectbox > div > div {
-        background-color: rgba(255,255,255,0.1);
-        color: white;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(f"<style>\n{load_custom_css()}</style>", unsafe_allow_html=True)
 
-def get_logo_base64():
-    """Get the logo as base64 for embedding"""
+LOGO_PATH = Path("Strathmore-University-Logo.png")
+
+def _read_station_workbook(path_xlsx):
+    """Read a station workbook through its Parquet copy, rebuilding the copy when the Excel file is newer"""
+    parquet_path = path_xlsx.with_suffix('.parquet')
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= path_xlsx.stat().st_mtime:
+        try:
+            return pd.read_parquet(parquet_path, engine='pyarrow')
+        except (OSError, ValueError):
+            pass  # Unreadable copy, rebuild it from the workbook below
+    
+    # pandas' openpyxl engine already opens the workbook with read_only=True and data_only=True,
+    # streaming rows instead of building the full in-memory workbook
+    df = pd.read_excel(path_xlsx, engine='openpyxl')
     try:
-        logo_path = Path("Strathmore-University-Logo.png")
-        if logo_path.exists():
-            with open(logo_path, "rb") as f:
-                data = f.read()
-                return base64.b64encode(data).decode()
-        return None
-    except:
-        return None
+        # Write to a temp file and swap it in, so a killed or concurrent load never sees a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=parquet_path.parent, prefix=f'{parquet_path.name}.', suffix='.tmp')
+    except OSError:
+        return df  # Read-only directory, use the workbook data directly
+    try:
+        os.close(fd)
+        df.to_parquet(tmp_name, engine='pyarrow', compression='zstd')
+        os.replace(tmp_name, parquet_path)
+    except OSError:
+        pass  # Could not write the copy; the workbook data is still usable
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+    return df
+
+def build_column_groups(columns):
+    """Group the measurement columns plotted together on each chart"""
+    return {
+        'vthd': tuple(col for col in columns if 'Vthd' in col and 'avg' in col),
+        'vln': tuple(col for col in columns if 'Vrms_AN_avg' in col or 'Vrms_BN_avg' in col or 'Vrms_CN_avg' in col),
+        'vll': tuple(col for col in columns if 'Vrms_AB_avg' in col or 'Vrms_BC_avg' in col or 'Vrms_CA_avg' in col),
+        'i': tuple(col for col in columns if 'Irms_A_avg' in col or 'Irms_B_avg' in col or 'Irms_C_avg' in col),
+        'ithd': tuple(col for col in columns if 'Ithd' in col and 'avg' in col),
+        'power': tuple(col for col in columns if 'PowerP_' in col and 'avg' in col),
+    }
+
+@st.cache_data(persist="disk", show_spinner=False, ttl=None)
+def _load_station_frame(station, file_path, workbook_mtime):
+    """Parse a station workbook; workbook_mtime is only part of the cache key"""
+    # Errors are raised rather than returned so a failed load is never cached
+    df = _read_station_workbook(Path(file_path))
+    
+    # Try different possible time column names
+    time_columns = [
+        'Stop(E. Africa Standard Time)',
+        'Start/Stop(E. Africa Standard Time)',
+        'Time',
+        'DateTime',
+        'Timestamp'
+    ]
+    
+    time_col = None
+    for col in time_columns:
+        if col in df.columns:
+            time_col = col
+            break
+    
+    if not time_col:
+        raise ValueError(f"Time column not found in {station} data. Available columns: {list(df.columns)}")
+    
+    df[time_col] = pd.to_datetime(df[time_col])
+    df = df.set_index(time_col)
+    
+    # Use a sorted DatetimeIndex for the time-of-day filters and binary-searched range
+    # lookups, at millisecond resolution (what JavaScript dates use) and without any timezone
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.as_unit('ms')
+    df.sort_index(inplace=True)
+    
+    # Store analog measurements as float32, with power already in kW/kVA/kVAr
+    analog_cols = [
+        col for col in df.columns
+        if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+    ]
+    df[analog_cols] = df[analog_cols].astype(np.float32)
+    power_cols = [col for col in analog_cols if col.startswith('Power')]
+    df[power_cols] /= 1000.0
+    
+    return df, build_column_groups(analog_cols)
 
-@st.cache_data
 def load_station_data(station):
-    """Load data for a specific station with caching"""
+    """Load data for a specific station with caching, along with its chart column groups and workbook mtime"""
+    if station == 'mvule':
+        file_path = Path('MVULE corrected time.xlsx')
+    else:  # clinic
+        file_path = Path('Clinic corrected time.xlsx')
+    
+    if not file_path.exists():
+        st.error(f"File not found: {file_path}")
+        return None, {}, None
+    
     try:
-        if station == 'mvule':
-            file_path = Path('MVULE corrected time.xlsx')
-        else:  # clinic
-            file_path = Path('Clinic corrected time.xlsx')
-        
-        if file_path.exists():
-            df = pd.read_excel(file_path)
-            
-            # Try different possible time column names
-            time_columns = [
-                'Stop(E. Africa Standard Time)',
-                'Start/Stop(E. Africa Standard Time)',
-                'Time',
-                'DateTime',
-                'Timestamp'
-            ]
-            
-            time_col = None
-            for col in time_columns:
-                if col in df.columns:
-                    time_col = col
-                    break
-            
-            if time_col:
-                df[time_col] = pd.to_datetime(df[time_col])
-                df = df.set_index(time_col)
-                return df
-            else:
-                st.error(f"Time column not found in {station} data. Available columns: {list(df.columns)}")
-                return None
-        else:
-            st.error(f"File not found: {file_path}")
-            return None
+        workbook_mtime = file_path.stat().st_mtime
+        df, col_groups = _load_station_frame(station, str(file_path), workbook_mtime)
+        return df, col_groups, workbook_mtime
     except Exception as e:
         st.error(f"Error loading data for {station}: {e}")
-        return None
+        return None, {}, None
+
+def load_stations_parallel(stations):
+    """Load several stations concurrently, returning {station: (df, col_groups, workbook_mtime)}"""
+    ctx = get_script_run_ctx()
+    
+    def load(station):
+        # Attach the script context so caching and error messages work from worker threads
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return load_station_data(station)
+    
+    with ThreadPoolExecutor(max_workers=len(stations)) as executor:
+        return dict(zip(stations, executor.map(load, stations)))
 
 def calculate_power_factor(df):
     """Calculate power factor as Active Power / Apparent Power"""
@@ -215,6 +220,16 @@ def calculate_total_voltage(df):
     avg_voltage = df[voltage_cols].mean(axis=1)
     return avg_voltage
 
+# Columns averaged directly for the KPI cards
+KPI_COLUMNS = [
+    'PowerP_Total_avg',
+    'Vrms_AN_avg',
+    'Irms_A_avg',
+    'Frequency_avg',
+    'Vthd_AN_avg',
+    'Ithd_A_avg',
+]
+
 def calculate_daily_averages(df):
     """Calculate daily averages for KPI metrics"""
     if df is None or df.empty:
@@ -226,22 +241,26 @@ def calculate_daily_averages(df):
         avg_voltage = calculate_total_voltage(df)
         power_factor = calculate_power_factor(df)
         
+        # Average every KPI column in a single fused NaN-aware pass; the kernel walks rows,
+        # so hand it a C-ordered copy rather than pandas' column-major view
+        present = [col for col in KPI_COLUMNS if col in df.columns]
+        column_means = dict.fromkeys(KPI_COLUMNS, np.nan)
+        if present:
+            values = np.ascontiguousarray(df[present].to_numpy(dtype=np.float32, na_value=np.nan))
+            column_means.update(zip(present, nanmean_cols(values)))
+        
         # Calculate KPIs directly from the data (not daily averages)
         kpis = {
-            'avg_power': df.get('PowerP_Total_avg', pd.Series()).mean(),
+            'avg_power': column_means['PowerP_Total_avg'],
             'avg_pf': power_factor.mean() if not power_factor.empty else 0,
-            'avg_voltage': avg_voltage.mean() if not avg_voltage.empty else df.get('Vrms_AN_avg', pd.Series()).mean(),
-            'avg_current': total_current.mean() if not total_current.empty else df.get('Irms_A_avg', pd.Series()).mean(),
-            'avg_frequency': df.get('Frequency_avg', pd.Series()).mean(),
-            'avg_vthd': df.get('Vthd_AN_avg', pd.Series()).mean(),
-            'avg_ithd': df.get('Ithd_A_avg', pd.Series()).mean(),
+            'avg_voltage': avg_voltage.mean() if not avg_voltage.empty else column_means['Vrms_AN_avg'],
+            'avg_current': total_current.mean() if not total_current.empty else column_means['Irms_A_avg'],
+            'avg_frequency': column_means['Frequency_avg'],
+            'avg_vthd': column_means['Vthd_AN_avg'],
+            'avg_ithd': column_means['Ithd_A_avg'],
             'data_points': len(df),
         }
         
-        # Convert power from W to kW
-        if 'avg_power' in kpis and not pd.isna(kpis['avg_power']):
-            kpis['avg_power'] = kpis['avg_power'] / 1000
-        
         return kpis
     except Exception as e:
         st.error(f"Error calculating averages: {e}")
@@ -271,9 +290,9 @@ def calculate_time_based_metrics(df, station):
     # Daytime metrics
     if not daytime_df.empty:
         metrics['daytime'] = {
-            'peak_power': daytime_df.get('PowerP_Total_avg', pd.Series()).max() / 1000,  # Convert to kW
-            'min_power': daytime_df.get('PowerP_Total_avg', pd.Series()).min() / 1000,   # Convert to kW
-            'avg_power': daytime_df.get('PowerP_Total_avg', pd.Series()).mean() / 1000,  # Convert to kW
+            'peak_power': daytime_df.get('PowerP_Total_avg', pd.Series()).max(),
+            'min_power': daytime_df.get('PowerP_Total_avg', pd.Series()).min(),
+            'avg_power': daytime_df.get('PowerP_Total_avg', pd.Series()).mean(),
             'avg_pf': daytime_pf.mean() if not daytime_pf.empty else 0,
             'avg_voltage': daytime_avg_voltage.mean() if not daytime_avg_voltage.empty else daytime_df.get('Vrms_AN_avg', pd.Series()).mean(),
             'avg_current': daytime_total_current.mean() if not daytime_total_current.empty else daytime_df.get('Irms_A_avg', pd.Series()).mean(),
@@ -283,9 +302,9 @@ def calculate_time_based_metrics(df, station):
     # Nighttime metrics
     if not nighttime_df.empty:
         metrics['nighttime'] = {
-            'peak_power': nighttime_df.get('PowerP_Total_avg', pd.Series()).max() / 1000,  # Convert to kW
-            'min_power': nighttime_df.get('PowerP_Total_avg', pd.Series()).min() / 1000,   # Convert to kW
-            'avg_power': nighttime_df.get('PowerP_Total_avg', pd.Series()).mean() / 1000,  # Convert to kW
+            'peak_power': nighttime_df.get('PowerP_Total_avg', pd.Series()).max(),
+            'min_power': nighttime_df.get('PowerP_Total_avg', pd.Series()).min(),
+            'avg_power': nighttime_df.get('PowerP_Total_avg', pd.Series()).mean(),
             'avg_pf': nighttime_pf.mean() if not nighttime_pf.empty else 0,
             'avg_voltage': nighttime_avg_voltage.mean() if not nighttime_avg_voltage.empty else nighttime_df.get('Vrms_AN_avg', pd.Series()).mean(),
             'avg_current': nighttime_total_current.mean() if not nighttime_total_current.empty else nighttime_df.get('Irms_A_avg', pd.Series()).mean(),
@@ -294,268 +313,356 @@ def calculate_time_based_metrics(df, station):
     
     return metrics
 
-def create_frequency_chart(df, station):
+def _reference_line(y, color, text):
+    """Build the dashed shape and label that fig.add_hline would create for a limit"""
+    shape = dict(
+        type='line', xref='x domain', x0=0, x1=1, yref='y', y0=y, y1=y,
+        line=dict(color=color, dash='dash')
+    )
+    annotation = dict(
+        text=text, xref='x domain', x=1, xanchor='right', yref='y', y=y, yanchor='bottom',
+        showarrow=False
+    )
+    return shape, annotation
+
+# Layout shared by every chart
+_BASE_LAYOUT = dict(
+    height=400,
+    hovermode='x unified',
+    showlegend=True,
+    xaxis=dict(title='Time')
+)
+
+# Reference lines for the fixed power quality limits
+FREQUENCY_LIMITS = (
+    _reference_line(50.5, 'red', 'Upper Limit (50.5 Hz)'),
+    _reference_line(49.5, 'red', 'Lower Limit (49.5 Hz)'),
+)
+VOLTAGE_THD_LIMITS = (
+    _reference_line(5, 'orange', 'Acceptable Limit (5%)'),
+)
+LINE_TO_NEUTRAL_LIMITS = (
+    _reference_line(253, 'red', 'Upper Limit (253V)'),
+    _reference_line(207, 'red', 'Lower Limit (207V)'),
+)
+LINE_TO_LINE_LIMITS = (
+    _reference_line(440, 'red', 'Upper Limit (440V)'),
+    _reference_line(360, 'red', 'Lower Limit (360V)'),
+)
+CURRENT_THD_LIMITS = (
+    _reference_line(8, 'orange', 'Acceptable Limit (8%)'),
+)
+POWER_FACTOR_LIMITS = (
+    _reference_line(0.9, 'orange', 'Recommended (0.9)'),
+)
+
+def create_chart_figure(title, yaxis_title, reference_lines=()):
+    """Create a figure with the shared layout, title and reference lines built in"""
+    layout = {
+        **_BASE_LAYOUT,
+        'title': title,
+        'yaxis': dict(title=yaxis_title),
+        'shapes': [shape for shape, _ in reference_lines],
+        'annotations': [annotation for _, annotation in reference_lines],
+    }
+    return go.Figure(layout=layout)
+
+# Points kept per trace after LTTB downsampling. Streamlit has no zoom callback to
+# re-aggregate, so this is also all the detail a zoomed-in view gets: a window covering
+# a fraction f of the series shows about f * LTTB_POINTS points.
+LTTB_POINTS = 5000
+
+def column_buffer(df, col):
+    """Return a measurement column as the contiguous float32 array the chart traces take"""
+    return np.ascontiguousarray(df[col].to_numpy(dtype=np.float32, na_value=np.nan))
+
+def downsampled_trace(x, y, **trace_kwargs):
+    """Create a line trace holding only the LTTB-selected points of a series, keeping NaN gaps"""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float32)
+    valid = ~np.isnan(y)
+    n_valid = int(valid.sum())
+    if n_valid <= LTTB_POINTS:
+        return go.Scattergl(x=x, y=y, mode='lines', **trace_kwargs)
+    
+    # Downsample each NaN-free run on its own, sharing the point budget by run length,
+    # and keep the NaN that ends each run so the line still breaks at data outages
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], valid.astype(np.int8), [0]))))
+    xs, ys = [], []
+    for start, end in zip(edges[::2], edges[1::2]):
+        run_x, run_y = x[start:end], y[start:end]
+        n_out = max(3, round(LTTB_POINTS * (end - start) / n_valid))
+        if end - start > n_out:
+            selected = LTTBDownsampler().downsample(run_x.view(np.int64), run_y, n_out=n_out)
+            run_x, run_y = run_x[selected], run_y[selected]
+        xs.append(run_x)
+        ys.append(run_y)
+        if end < len(y):
+            xs.append(x[end:end + 1])
+            ys.append(y[end:end + 1])
+    return go.Scattergl(x=np.concatenate(xs), y=np.concatenate(ys), mode='lines', **trace_kwargs)
+
+def create_frequency_chart(df, station, col_groups):
     """Create frequency analysis chart"""
     if df is None or df.empty or 'Frequency_avg' not in df.columns:
         return None
     
-    fig = go.Figure()
+    # Reference lines mark the acceptable frequency range
+    fig = create_chart_figure(
+        f'{station.title()} Station - Frequency Analysis',
+        'Frequency (Hz)',
+        FREQUENCY_LIMITS
+    )
+    
+    # Time axis shared by every trace
+    x = df.index.to_numpy()
     
-    fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['Frequency_avg'],
-        mode='lines',
+    fig.add_trace(downsampled_trace(
+        x,
+        column_buffer(df, 'Frequency_avg'),
         name='Frequency (Hz)',
         line=dict(color='blue', width=2)
     ))
     
-    # Add reference lines for acceptable frequency range
-    fig.add_hline(y=50.5, line_dash="dash", line_color="red", 
-                  annotation_text="Upper Limit (50.5 Hz)")
-    fig.add_hline(y=49.5, line_dash="dash", line_color="red", 
-                  annotation_text="Lower Limit (49.5 Hz)")
-    
-    fig.update_layout(
-        title=f'{station.title()} Station - Frequency Analysis',
-        xaxis_title='Time',
-        yaxis_title='Frequency (Hz)',
-        height=400,
-        hovermode='x unified',
-        showlegend=True
-    )
-    
     return fig
 
-def create_voltage_thd_chart(df, station):
+def create_voltage_thd_chart(df, station, col_groups):
     """Create voltage THD analysis chart"""
     if df is None or df.empty:
         return None
     
-    fig = go.Figure()
+    # Reference line marks the acceptable THD
+    fig = create_chart_figure(
+        f'{station.title()} Station - Voltage THD Analysis',
+        'Voltage THD (%)',
+        VOLTAGE_THD_LIMITS
+    )
+    
+    # Time axis shared by every trace
+    x = df.index.to_numpy()
     
     # Add voltage THD data
-    vthd_cols = [col for col in df.columns if 'Vthd' in col and 'avg' in col]
+    vthd_cols = col_groups.get('vthd', ())
     colors = ['red', 'green', 'blue']
     for i, col in enumerate(vthd_cols):
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df[col],
-            mode='lines',
+        fig.add_trace(downsampled_trace(
+            x,
+            column_buffer(df, col),
             name=f'{col.replace("_avg", "")} (%)',
             line=dict(color=colors[i], width=2)
         ))
     
-    # Add reference line for acceptable THD
-    fig.add_hline(y=5, line_dash="dash", line_color="orange", 
-                  annotation_text="Acceptable Limit (5%)")
-    
-    fig.update_layout(
-        title=f'{station.title()} Station - Voltage THD Analysis',
-        xaxis_title='Time',
-        yaxis_title='Voltage THD (%)',
-        height=400,
-        hovermode='x unified',
-        showlegend=True
-    )
-    
     return fig
 
-def create_voltage_analysis_chart(df, station):
+def create_voltage_analysis_chart(df, station, col_groups):
     """Create voltage analysis chart"""
     if df is None or df.empty:
         return None
     
-    fig = go.Figure()
+    # Reference lines mark the acceptable voltage range
+    fig = create_chart_figure(
+        f'{station.title()} Station - Line-to-Neutral Voltage Analysis',
+        'Voltage (V)',
+        LINE_TO_NEUTRAL_LIMITS
+    )
+    
+    # Time axis shared by every trace
+    x = df.index.to_numpy()
     
     # Add line-to-neutral voltage data
-    vln_cols = [col for col in df.columns if 'Vrms_AN_avg' in col or 'Vrms_BN_avg' in col or 'Vrms_CN_avg' in col]
+    vln_cols = col_groups.get('vln', ())
     colors = ['red', 'green', 'blue']
     for i, col in enumerate(vln_cols):
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df[col],
-            mode='lines',
+        fig.add_trace(downsampled_trace(
+            x,
+            column_buffer(df, col),
             name=col.replace('_avg', ''),
             line=dict(color=colors[i], width=2)
         ))
     
-    # Add reference lines for acceptable voltage range
-    fig.add_hline(y=253, line_dash="dash", line_color="red", 
-                  annotation_text="Upper Limit (253V)")
-    fig.add_hline(y=207, line_dash="dash", line_color="red", 
-                  annotation_text="Lower Limit (207V)")
-    
-    fig.update_layout(
-        title=f'{station.title()} Station - Line-to-Neutral Voltage Analysis',
-        xaxis_title='Time',
-        yaxis_title='Voltage (V)',
-        height=400,
-        hovermode='x unified',
-        showlegend=True
-    )
-    
     return fig
 
-def create_line_to_line_voltage_chart(df, station):
+def create_line_to_line_voltage_chart(df, station, col_groups):
     """Create line-to-line voltage analysis chart"""
     if df is None or df.empty:
         return None
     
-    fig = go.Figure()
+    # Reference lines mark the acceptable voltage range
+    fig = create_chart_figure(
+        f'{station.title()} Station - Line-to-Line Voltage Analysis',
+        'Voltage (V)',
+        LINE_TO_LINE_LIMITS
+    )
+    
+    # Time axis shared by every trace
+    x = df.index.to_numpy()
     
     # Add line-to-line voltage data
-    vll_cols = [col for col in df.columns if 'Vrms_AB_avg' in col or 'Vrms_BC_avg' in col or 'Vrms_CA_avg' in col]
+    vll_cols = col_groups.get('vll', ())
     colors = ['purple', 'orange', 'brown']
     for i, col in enumerate(vll_cols):
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df[col],
-            mode='lines',
+        fig.add_trace(downsampled_trace(
+            x,
+            column_buffer(df, col),
             name=col.replace('_avg', ''),
             line=dict(color=colors[i], width=2)
         ))
     
-    # Add reference lines for acceptable voltage range
-    fig.add_hline(y=440, line_dash="dash", line_color="red", 
-                  annotation_text="Upper Limit (440V)")
-    fig.add_hline(y=360, line_dash="dash", line_color="red", 
-                  annotation_text="Lower Limit (360V)")
-    
-    fig.update_layout(
-        title=f'{station.title()} Station - Line-to-Line Voltage Analysis',
-        xaxis_title='Time',
-        yaxis_title='Voltage (V)',
-        height=400,
-        hovermode='x unified',
-        showlegend=True
-    )
-    
     return fig
 
-def create_current_analysis_chart(df, station):
+def create_current_analysis_chart(df, station, col_groups):
     """Create current analysis chart"""
     if df is None or df.empty:
         return None
     
-    fig = go.Figure()
+    fig = create_chart_figure(
+        f'{station.title()} Station - Current Analysis',
+        'Current (A)'
+    )
+    
+    # Time axis shared by every trace
+    x = df.index.to_numpy()
     
     # Add current data
-    current_cols = [col for col in df.columns if 'Irms_A_avg' in col or 'Irms_B_avg' in col or 'Irms_C_avg' in col]
+    current_cols = col_groups.get('i', ())
     colors = ['red', 'green', 'blue']
     for i, col in enumerate(current_cols):
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df[col],
-            mode='lines',
+        fig.add_trace(downsampled_trace(
+            x,
+            column_buffer(df, col),
             name=col.replace('_avg', ''),
             line=dict(color=colors[i], width=2)
         ))
     
-    fig.update_layout(
-        title=f'{station.title()} Station - Current Analysis',
-        xaxis_title='Time',
-        yaxis_title='Current (A)',
-        height=400,
-        hovermode='x unified',
-        showlegend=True
-    )
-    
     return fig
 
-def create_current_thd_chart(df, station):
+def create_current_thd_chart(df, station, col_groups):
     """Create current THD analysis chart"""
     if df is None or df.empty:
         return None
     
-    fig = go.Figure()
+    # Reference line marks the acceptable THD
+    fig = create_chart_figure(
+        f'{station.title()} Station - Current THD Analysis',
+        'Current THD (%)',
+        CURRENT_THD_LIMITS
+    )
+    
+    # Time axis shared by every trace
+    x = df.index.to_numpy()
     
     # Add current THD data
-    ithd_cols = [col for col in df.columns if 'Ithd' in col and 'avg' in col]
+    ithd_cols = col_groups.get('ithd', ())
     colors = ['purple', 'orange', 'brown']
     for i, col in enumerate(ithd_cols):
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df[col],
-            mode='lines',
+        fig.add_trace(downsampled_trace(
+            x,
+            column_buffer(df, col),
             name=f'{col.replace("_avg", "")} (%)',
             line=dict(color=colors[i], width=2)
         ))
     
-    # Add reference line for acceptable THD
-    fig.add_hline(y=8, line_dash="dash", line_color="orange", 
-                  annotation_text="Acceptable Limit (8%)")
-    
-    fig.update_layout(
-        title=f'{station.title()} Station - Current THD Analysis',
-        xaxis_title='Time',
-        yaxis_title='Current THD (%)',
-        height=400,
-        hovermode='x unified',
-        showlegend=True
-    )
-    
     return fig
 
-def create_power_factor_chart(df, station):
+def create_power_factor_chart(df, station, col_groups):
     """Create power factor analysis chart"""
     if df is None or df.empty:
         return None
     
-    fig = go.Figure()
+    # Reference line marks the recommended power factor
+    fig = create_chart_figure(
+        f'{station.title()} Station - Power Factor Analysis (Active/Apparent Power)',
+        'Power Factor',
+        POWER_FACTOR_LIMITS
+    )
+    
+    # Time axis shared by every trace
+    x = df.index.to_numpy()
     
     # Calculate power factor using the correct formula
     power_factor = calculate_power_factor(df)
     
     if not power_factor.empty:
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=power_factor,
-            mode='lines',
+        fig.add_trace(downsampled_trace(
+            x,
+            power_factor.to_numpy(dtype=np.float32),
             name='Power Factor (Active/Apparent)',
             line=dict(color='blue', width=2)
         ))
     
-    # Add reference line for acceptable power factor
-    fig.add_hline(y=0.9, line_dash="dash", line_color="orange", 
-                  annotation_text="Recommended (0.9)")
-    
-    fig.update_layout(
-        title=f'{station.title()} Station - Power Factor Analysis (Active/Apparent Power)',
-        xaxis_title='Time',
-        yaxis_title='Power Factor',
-        height=400,
-        hovermode='x unified',
-        showlegend=True
-    )
-    
     return fig
 
-def create_active_power_chart(df, station):
+def create_active_power_chart(df, station, col_groups):
     """Create active power analysis chart"""
     if df is None or df.empty:
         return None
     
-    fig = go.Figure()
+    fig = create_chart_figure(
+        f'{station.title()} Station - Active Power Analysis',
+        'Power (kW)'
+    )
+    
+    # Time axis shared by every trace
+    x = df.index.to_numpy()
     
-    # Add power data (convert to kW)
-    power_cols = [col for col in df.columns if 'PowerP_' in col and 'avg' in col]
+    # Add power data (already in kW)
+    power_cols = col_groups.get('power', ())
     colors = ['red', 'green', 'blue', 'purple']
     for i, col in enumerate(power_cols):
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df[col] / 1000,  # Convert to kW
-            mode='lines',
+        fig.add_trace(downsampled_trace(
+            x,
+            column_buffer(df, col),
             name=f'{col.replace("_avg", "")} (kW)',
             line=dict(color=colors[i], width=2)
         ))
     
+    return fig
+
+# Charts stacked on each station analysis tab, all taking (df, station, col_groups)
+STATION_TAB_CHARTS = {
+    'power_quality': (create_frequency_chart, create_voltage_thd_chart),
+    'voltage': (create_voltage_analysis_chart, create_line_to_line_voltage_chart),
+    'current': (create_current_analysis_chart, create_current_thd_chart),
+    'harmonics': (create_voltage_thd_chart, create_current_thd_chart),
+    'power_factor': (create_power_factor_chart, create_active_power_chart),
+}
+
+@st.cache_resource(show_spinner=False, max_entries=20)
+def build_station_dashboard(_df, station, tab, _col_groups, workbook_mtime):
+    """Stack a tab's charts into one shared-x figure, built once per station, tab and workbook version"""
+    from plotly.subplots import make_subplots
+    
+    figures = [build(_df, station, _col_groups) for build in STATION_TAB_CHARTS[tab]]
+    figures = [source for source in figures if source is not None]
+    if not figures:
+        return None
+    
+    fig = make_subplots(
+        rows=len(figures),
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.08,
+        subplot_titles=[source.layout.title.text for source in figures]
+    )
+    
+    for row, source in enumerate(figures, start=1):
+        for trace in source.data:
+            fig.add_trace(type(trace)(trace, legendgroup=str(row)), row=row, col=1)
+        fig.update_yaxes(title_text=source.layout.yaxis.title.text, row=row, col=1)
+        
+        # Point the reference lines at this row's axes
+        suffix = '' if row == 1 else str(row)
+        for shape in source.layout.shapes:
+            fig.add_shape({**shape.to_plotly_json(), 'xref': f'x{suffix} domain', 'yref': f'y{suffix}'})
+        for annotation in source.layout.annotations:
+            fig.add_annotation({**annotation.to_plotly_json(), 'xref': f'x{suffix} domain', 'yref': f'y{suffix}'})
+    
+    fig.update_xaxes(title_text='Time', row=len(figures), col=1)
     fig.update_layout(
-        title=f'{station.title()} Station - Active Power Analysis',
-        xaxis_title='Time',
-        yaxis_title='Power (kW)',
-        height=400,
-        hovermode='x unified',
-        showlegend=True
+        height=_BASE_LAYOUT['height'] * len(figures),
+        hovermode=_BASE_LAYOUT['hovermode'],
+        showlegend=True,
+        legend=dict(tracegroupgap=_BASE_LAYOUT['height'] // 2)
     )
     
     return fig
@@ -564,14 +671,9 @@ def create_active_power_chart(df, station):
 def main():
     # Sidebar with logo
     with st.sidebar:
-        # Logo at the top of sidebar
-        logo_base64 = get_logo_base64()
-        if logo_base64:
-            st.markdown(f"""
-            <div class="sidebar-logo">
-                <img src="data:image/png;base64,{logo_base64}" alt="Strathmore University Logo">
-            </div>
-            """, unsafe_allow_html=True)
+        # Logo at the top of sidebar, served from Streamlit's media endpoint
+        if LOGO_PATH.exists():
+            st.image(str(LOGO_PATH), width=250)
         
         st.markdown('<div class="sidebar-title">Energy Audit Dashboard</div>', unsafe_allow_html=True)
         
@@ -601,9 +703,10 @@ def show_overview():
     """Show the main overview page"""
     st.markdown("## Overview Dashboard")
     
-    # Load data
-    mvule_data = load_station_data('mvule')
-    clinic_data = load_station_data('clinic')
+    # Load both stations concurrently so a cold start overlaps the two file reads
+    station_data = load_stations_parallel(['mvule', 'clinic'])
+    mvule_data, _, _ = station_data['mvule']
+    clinic_data, _, _ = station_data['clinic']
     
     # Calculate KPIs
     mvule_kpis = calculate_daily_averages(mvule_data)
@@ -669,7 +772,7 @@ def show_station_analysis(station, station_name):
     st.markdown(f"## {station_name} Station Analysis")
     
     # Load data
-    df = load_station_data(station)
+    df, col_groups, workbook_mtime = load_station_data(station)
     kpis = calculate_daily_averages(df)
     time_metrics = calculate_time_based_metrics(df, station)
     
@@ -726,23 +829,16 @@ def show_station_analysis(station, station_name):
     with tab1:
         st.markdown("### Power Quality Analysis")
         
-        # Frequency Analysis
-        st.markdown("#### Frequency Analysis")
-        freq_fig = create_frequency_chart(df, station)
-        if freq_fig:
-            st.plotly_chart(freq_fig, use_container_width=True, key=f"freq_{station}")
+        # Frequency and Voltage THD Analysis
+        pq_fig = build_station_dashboard(df, station, 'power_quality', col_groups, workbook_mtime)
+        if pq_fig:
+            st.plotly_chart(pq_fig, use_container_width=True, key=f"pq_{station}")
             st.markdown("""
             <div class="insight-box">
                 <h6>📊 Frequency Insights</h6>
                 <p>Frequency variations are monitored to ensure grid stability. Values should remain within 49.5-50.5 Hz range.</p>
             </div>
             """, unsafe_allow_html=True)
-        
-        # Voltage THD Analysis
-        st.markdown("#### Voltage THD Analysis")
-        vthd_fig = create_voltage_thd_chart(df, station)
-        if vthd_fig:
-            st.plotly_chart(vthd_fig, use_container_width=True, key=f"vthd_pq_{station}")
             st.markdown("""
             <div class="insight-box">
                 <h6>⚡ Voltage THD Insights</h6>
@@ -753,23 +849,16 @@ def show_station_analysis(station, station_name):
     with tab2:
         st.markdown("### Voltage Analysis")
         
-        # Line-to-Neutral Voltage
-        st.markdown("#### Line-to-Neutral Voltage Analysis")
-        vln_fig = create_voltage_analysis_chart(df, station)
-        if vln_fig:
-            st.plotly_chart(vln_fig, use_container_width=True, key=f"vln_{station}")
+        # Line-to-Neutral and Line-to-Line Voltage
+        voltage_fig = build_station_dashboard(df, station, 'voltage', col_groups, workbook_mtime)
+        if voltage_fig:
+            st.plotly_chart(voltage_fig, use_container_width=True, key=f"voltage_{station}")
             st.markdown("""
             <div class="insight-box">
                 <h6>⚡ Line-to-Neutral Voltage Insights</h6>
                 <p>Voltage should remain within 207-253V range. Variations indicate load changes or grid issues.</p>
             </div>
             """, unsafe_allow_html=True)
-        
-        # Line-to-Line Voltage
-        st.markdown("#### Line-to-Line Voltage Analysis")
-        vll_fig = create_line_to_line_voltage_chart(df, station)
-        if vll_fig:
-            st.plotly_chart(vll_fig, use_container_width=True, key=f"vll_{station}")
             st.markdown("""
             <div class="insight-box">
                 <h6>⚡ Line-to-Line Voltage Insights</h6>
@@ -780,9 +869,8 @@ def show_station_analysis(station, station_name):
     with tab3:
         st.markdown("### Current Analysis")
         
-        # Current Analysis
-        st.markdown("#### Current Distribution")
-        current_fig = create_current_analysis_chart(df, station)
+        # Current Distribution and Current THD Analysis
+        current_fig = build_station_dashboard(df, station, 'current', col_groups, workbook_mtime)
         if current_fig:
             st.plotly_chart(current_fig, use_container_width=True, key=f"current_{station}")
             st.markdown("""
@@ -791,12 +879,6 @@ def show_station_analysis(station, station_name):
                 <p>Current should be balanced across phases. Imbalances indicate uneven load distribution.</p>
             </div>
             """, unsafe_allow_html=True)
-        
-        # Current THD Analysis
-        st.markdown("#### Current THD Analysis")
-        ithd_fig = create_current_thd_chart(df, station)
-        if ithd_fig:
-            st.plotly_chart(ithd_fig, use_container_width=True, key=f"ithd_current_{station}")
             st.markdown("""
             <div class="insight-box">
                 <h6>📊 Current THD Insights</h6>
@@ -807,23 +889,16 @@ def show_station_analysis(station, station_name):
     with tab4:
         st.markdown("### Harmonics Analysis")
         
-        # Voltage THD
-        st.markdown("#### Voltage THD Analysis")
-        vthd_fig = create_voltage_thd_chart(df, station)
-        if vthd_fig:
-            st.plotly_chart(vthd_fig, use_container_width=True, key=f"vthd_harmonics_{station}")
+        # Voltage THD and Current THD
+        harmonics_fig = build_station_dashboard(df, station, 'harmonics', col_groups, workbook_mtime)
+        if harmonics_fig:
+            st.plotly_chart(harmonics_fig, use_container_width=True, key=f"harmonics_{station}")
             st.markdown("""
             <div class="insight-box">
                 <h6>⚡ Voltage Harmonics Insights</h6>
                 <p>Voltage THD indicates power quality. Values above 5% require harmonic filtering.</p>
             </div>
             """, unsafe_allow_html=True)
-        
-        # Current THD
-        st.markdown("#### Current THD Analysis")
-        ithd_fig = create_current_thd_chart(df, station)
-        if ithd_fig:
-            st.plotly_chart(ithd_fig, use_container_width=True, key=f"ithd_harmonics_{station}")
             st.markdown("""
             <div class="insight-box">
                 <h6>📊 Current Harmonics Insights</h6>
@@ -834,9 +909,8 @@ def show_station_analysis(station, station_name):
     with tab5:
         st.markdown("### Power Factor Analysis")
         
-        # Power Factor
-        st.markdown("#### Power Factor Analysis")
-        pf_fig = create_power_factor_chart(df, station)
+        # Power Factor and Active Power
+        pf_fig = build_station_dashboard(df, station, 'power_factor', col_groups, workbook_mtime)
         if pf_fig:
             st.plotly_chart(pf_fig, use_container_width=True, key=f"pf_{station}")
             st.markdown("""
@@ -845,12 +919,6 @@ def show_station_analysis(station, station_name):
                 <p>Power factor should be close to 1.0. Low values indicate reactive power consumption.</p>
             </div>
             """, unsafe_allow_html=True)
-        
-        # Active Power
-        st.markdown("#### Active Power Analysis")
-        power_fig = create_active_power_chart(df, station)
-        if power_fig:
-            st.plotly_chart(power_fig, use_container_width=True, key=f"power_{station}")
             st.markdown("""
             <div class="insight-box">
                 <h6>⚡ Active Power Insights</h6>
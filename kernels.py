@@ -0,0 +1,29 @@
+import numpy as np
+from numba import get_num_threads, njit, prange
+
+# Kept out of the Streamlit script, which is re-executed on every rerun,
+# so the compiled kernels live for the whole process once imported
+
+@njit(parallel=True, cache=True)
+def nanmean_cols(a):
+    """NaN-ignoring mean of each column of a C-contiguous 2-D array, accumulated in one fused pass over the rows"""
+    n_rows, n_cols = a.shape
+    n_chunks = max(1, min(n_rows, get_num_threads()))
+    chunk = (n_rows + n_chunks - 1) // n_chunks
+    
+    # Each row chunk keeps its own partial sums so parallel workers never share an accumulator
+    sums = np.zeros((n_chunks, n_cols))
+    counts = np.zeros((n_chunks, n_cols), dtype=np.int64)
+    for k in prange(n_chunks):
+        for i in range(k * chunk, min((k + 1) * chunk, n_rows)):
+            for j in range(n_cols):
+                v = a[i, j]
+                if not np.isnan(v):
+                    sums[k, j] += v
+                    counts[k, j] += 1
+    
+    means = np.empty(n_cols)
+    for j in range(n_cols):
+        total = counts[:, j].sum()
+        means[j] = sums[:, j].sum() / total if total > 0 else np.nan
+    return means